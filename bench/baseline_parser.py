@@ -0,0 +1,178 @@
+"""
+Copy of _parse_puzzle_file as it was before the Puzzle model (baseline
+src/fetcher.py), kept so memory_bench.py measures the original dict
+based parser as "before". Do not change it.
+"""
+import datetime
+from exceptions import (
+    FetchParsingError,
+    FetchUnsupportedError,
+)
+from constants import PLUGIN_NAME, VERSION
+
+from exceptions import logAndRaise
+
+
+def _parse_puzzle_file(text):
+    """
+    Args:
+        text (string) : text from file retrieved from nytsyn.pzzl.com endpoint
+    Returns:
+        fetchResponse
+    Raises:
+        FetchParsingError:
+        FetchUnsupportedError:
+    """
+
+    lines = text.split('\n')
+
+    # 0 is ARCHIVE
+    # 2 is YYMMDD
+    # 4 is Puzzle Name
+    # 6 is Author(s)
+    # 8 is puzzle width
+    # 10 is puzzle height
+    # 16 is start of puzzle geometry : lineHeight = G
+    # 16+G+1 is Across clues : acrossCluesCount = C
+    # (16+G+1) + C + 1 is Down Clues : DownCluesCount = D
+
+    ###################################
+    # Integrity Check "ARCHIVE" Line
+    ###################################
+    if lines[0] != "ARCHIVE":
+        logAndRaise(FetchParsingError,
+                    "format appears off, expected ARCHIVE as first line")
+
+    ###################################
+    # Puzzle Data
+    ###################################
+
+    releaseDate = lines[2]  # yymmdd -> yyyymmdd
+    releaseDate = "20"+releaseDate
+    releaseDate = datetime.datetime.strptime(releaseDate, '%Y%m%d')
+
+    title = lines[4]
+    author = lines[6]
+    rows = int(lines[8])
+    columns = int(lines[10])
+    acrossClueCount = int(lines[12])
+    downClueCount = int(lines[14])
+
+    ###################################
+    # Extract Solution Geometry
+    ###################################
+
+    solution = [['*'] * (columns+1) for i in range(0, rows+1)]
+    ln = 16
+    while (lines[ln] != ""):
+        line = lines[ln]
+        if "," in line:
+            logAndRaise(FetchUnsupportedError,
+                        "Solution geometry contains \",\" characters")
+        elif "." in line:
+            logAndRaise(FetchUnsupportedError,
+                        "Solution geometry contains \".\" characters")
+        elif "^" in line:
+            logAndRaise(FetchUnsupportedError,
+                        "Solution geometry contains \"^\" characters")
+        elif len(line) != columns:
+            logAndRaise(FetchUnsupportedError,
+                        f"Solution geometry contradicts row length : line length {len(line)} columns {columns}")
+
+        for i, c in enumerate(line):
+            solution[ln-16][i] = c
+        ln += 1
+
+    ###################################
+    # Extract Across Clues
+    ###################################
+    acrossClues = []
+    ln += 1
+    acrossStop = ln + acrossClueCount
+    while (ln != acrossStop):
+        acrossClues.append(lines[ln])
+        ln += 1
+    # Integrity Check AC matches actual
+    if len(acrossClues) != acrossClueCount:
+        logAndRaise(FetchParsingError,
+                    f"Across Clues Count Integrity Check Failed : expected {acrossClueCount} got {len(acrossClues)}")
+
+    ###################################
+    # Extract Down Clues
+    ###################################
+    downClues = []
+    ln += 1
+    downStop = ln + downClueCount
+    while (ln != downStop):
+        downClues.append(lines[ln])
+        ln += 1
+    # Integrity Check DC matches actual
+    if len(downClues) != downClueCount:
+        logAndRaise(FetchParsingError,
+                    f"Down Clues Count Integrity Check Failed : expected {downClueCount} got {len(downClues)}")
+
+    ###################################
+    # Reconstitute into standard format
+    ###################################
+
+    clues = []
+
+    for j in range(0, rows):
+        for i in range(0, columns):
+
+            # not a word start
+            if solution[j][i] == '#':
+                continue
+
+            # encountered start of across clue
+            if i != (columns-1) and (i == 0 or solution[j][i-1] == '#'):
+                # parse answer
+                answer = ""
+                x = i
+                while x != (columns) and solution[j][x] != '#':
+                    answer += solution[j][x]
+                    x += 1
+                # reconsitute
+                prompt = acrossClues.pop(0)
+                clues.append({
+                    "x": i,
+                    "y": j,
+                    "i": acrossClueCount - len(acrossClues),
+                    "d": "across",
+                    "prompt": prompt,
+                    "answer": answer
+                })
+
+            # encountered start of down clue
+            if j != (rows-1) and (j == 0 or solution[j-1][i] == '#'):
+                # parse answer
+                answer = ""
+                y = j
+                while y != (rows) and solution[y][i] != '#':
+                    answer += solution[y][i]
+                    y += 1
+                prompt = downClues.pop(0)
+                clues.append({
+                    "x": i,
+                    "y": j,
+                    "i": downClueCount - len(downClues),
+                    "d": "down",
+                    "prompt": prompt,
+                    "answer": answer
+                })
+
+    fetchResponse = {
+        "meta": {
+            "plugin": PLUGIN_NAME,
+            "pluginVersion": VERSION,
+            "fetchDate": str(datetime.datetime.now())
+        },
+        "columns": columns,
+        "rows": rows,
+        "clues": clues,
+        "title": title,
+        "author": author,
+        "releaseDate": str(releaseDate.date())
+    }
+
+    return fetchResponse
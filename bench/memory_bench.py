@@ -0,0 +1,148 @@
+"""
+Memory benchmark for holding parsed puzzles in memory.
+
+Parses the same synthetic puzzle file N times (default 1000) and keeps
+every result alive, once with the original dict based parser (a copy is
+kept in baseline_parser.py) and once as the compact Puzzle model. Each
+shape is measured in its own process so RSS is not skewed by memory the
+other left behind. RSS growth is measured in a pass without tracemalloc,
+whose own trace tables would otherwise inflate it, and the traced
+allocation in a second pass. Both are reported per 1000 puzzles.
+
+Usage:
+    python bench/memory_bench.py [N]
+"""
+import gc
+import os
+import subprocess
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fetcher import _parse_puzzle_file  # noqa: E402
+from baseline_parser import _parse_puzzle_file as _baseline_parse_puzzle_file  # noqa: E402
+
+ROWS = 15
+COLUMNS = 15
+
+# symmetric 15x15 block pattern, similar in density to a daily puzzle
+BLOCKS = [
+    "....#.....#....",
+    "....#.....#....",
+    "...............",
+    "...#...#...#...",
+    "######...#.....",
+    "......#...#....",
+    "...#.....#.....",
+    "....#.....#....",
+    ".....#.....#...",
+    "....#...#......",
+    ".....#...######",
+    "...#...#...#...",
+    "...............",
+    "....#.....#....",
+    "....#.....#....",
+]
+
+
+def _synthetic_puzzle_file():
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    geometry = []
+    for j, row in enumerate(BLOCKS):
+        geometry.append("".join(
+            '#' if c == '#' else letters[(i * 7 + j * 3) % 26]
+            for i, c in enumerate(row)))
+
+    def starts(across):
+        count = 0
+        for j in range(ROWS):
+            for i in range(COLUMNS):
+                if geometry[j][i] == '#':
+                    continue
+                if across and i != COLUMNS - 1 and (i == 0 or geometry[j][i-1] == '#'):
+                    count += 1
+                if not across and j != ROWS - 1 and (j == 0 or geometry[j-1][i] == '#'):
+                    count += 1
+        return count
+
+    acrossCount = starts(True)
+    downCount = starts(False)
+    lines = [
+        "ARCHIVE", "",
+        "250404", "",
+        "Synthetic Puzzle", "",
+        "Benchmark Author", "",
+        str(ROWS), "",
+        str(COLUMNS), "",
+        str(acrossCount), "",
+        str(downCount), "",
+    ]
+    lines += geometry
+    lines.append("")
+    lines += [f"Across prompt number {n} for the benchmark" for n in range(acrossCount)]
+    lines.append("")
+    lines += [f"Down prompt number {n} for the benchmark" for n in range(downCount)]
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _rss():
+    """Current resident set size in bytes (linux only, 0 elsewhere)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _held_rss(count, build):
+    # each file gets its own copy of the text so prompts are not shared
+    texts = [_synthetic_puzzle_file() for _ in range(count)]
+    gc.collect()
+    rssBefore = _rss()
+    held = [build(text) for text in texts]
+    gc.collect()
+    return _rss() - rssBefore
+
+
+def _held_traced(count, build):
+    texts = [_synthetic_puzzle_file() for _ in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    held = [build(text) for text in texts]
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return traced
+
+
+def _measure(label, count, build):
+    rss = _held_rss(count, build)
+    gc.collect()
+    traced = _held_traced(count, build)
+    perThousand = 1000 / count / 1024 / 1024
+    print(f"{label:<12} per 1000 puzzles :"
+          f"   rss {rss * perThousand:8.2f} MiB"
+          f"   traced {traced * perThousand:8.2f} MiB")
+
+
+MODES = {
+    "dict": _baseline_parse_puzzle_file,
+    "Puzzle": _parse_puzzle_file,
+}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    if len(sys.argv) > 2:
+        _measure(sys.argv[2], count, MODES[sys.argv[2]])
+        return
+    print(f"holding {count} parsed puzzles")
+    sys.stdout.flush()
+    for mode in MODES:
+        subprocess.run([sys.executable, os.path.abspath(__file__), str(count), mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,3 +4,5 @@ API_VERSION = "v1"
 PLUGIN_NAME = "NYTSyn"
 DATE_MINIMUM = datetime.datetime(2016, 1, 1).date()
 SCHEMA_BASE_URL = "https://raw.githubusercontent.com/matthewKeville/enigma/master/enigma/src/Models/" + API_VERSION + "/Plugin/Generated/"
+# node-exporter textfile to merge metrics into, metrics are not written if unset
+METRICS_TEXTFILE_ENV = "NYTSYN_METRICS_TEXTFILE"
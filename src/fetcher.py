@@ -1,5 +1,7 @@
 import requests
+import codecs
 import datetime
+import time
 import json
 import logging
 from exceptions import (
@@ -11,12 +13,28 @@ from exceptions import (
     FetchParsingError,
     FetchUnsupportedError,
 )
-from constants import DATE_MINIMUM, PLUGIN_NAME, VERSION, API_VERSION
+from constants import DATE_MINIMUM, API_VERSION
 
 from exceptions import logAndRaise
+from puzzle import Puzzle, Clue, ACROSS, DOWN, BLOCK
+from metrics import (
+    timed,
+    FETCH_REQUESTS,
+    FETCH_ERRORS,
+    FETCH_SECONDS,
+    UPSTREAM_REQUESTS,
+    UPSTREAM_ERRORS,
+    UPSTREAM_BYTES,
+    UPSTREAM_SECONDS,
+    PARSE_ERRORS,
+    PARSE_SECONDS,
+)
 
 DATE_FMT = "%Y/%m/%d"
 
+# small chunks so a rejected puzzle stops the download early
+STREAM_CHUNK_SIZE = 1024
+
 # request types [ Date ]
 # request type restrictions
 # Date : xx/xx/xx - yy/yy/yy
@@ -77,18 +95,22 @@ def fetch(fetch_request):
     """
     method = fetch_request["method"]
     fetchResponse = None
-    match method:
-        case "date":
-            fetchResponse = _fetch_by_date(*fetch_request["args"])
-        case "today":
-            fetchResponse = _fetch_by_today(*fetch_request["args"])
-        case _:
-            logAndRaise(FetchMethodError,
-                        f" fetch method {method} is invalid")
+    # keep label cardinality bounded to the known methods
+    methodLabel = method if method in FETCH_METHODS else "unknown"
+    FETCH_REQUESTS.inc(methodLabel)
+    with timed(FETCH_SECONDS, FETCH_ERRORS, methodLabel):
+        match method:
+            case "date":
+                fetchResponse = _fetch_by_date(*fetch_request["args"])
+            case "today":
+                fetchResponse = _fetch_by_today(*fetch_request["args"])
+            case _:
+                logAndRaise(FetchMethodError,
+                            f" fetch method {method} is invalid")
     response = {
         "type": "fetch",
         "apiVersion": API_VERSION,
-        "fetch": fetchResponse
+        "fetch": fetchResponse.to_dict()
     }
     return response
 
@@ -113,7 +135,7 @@ def _fetch_by_date(dateString):
     Args:
         dateString (string) : the target crossword release date "%Y/%m/%d"
     Returns:
-        fetchResponse
+        puzzle (Puzzle)
     Raises:
         FetchArgsError,
         FetchNetworkError,
@@ -133,8 +155,7 @@ def _fetch_by_date(dateString):
     if date > datetime.datetime.now().date():
         logAndRaise(FetchArgsError, f"date {date} exceeds current date")
 
-    text = _get_puzzle_by_date(date)
-    fetchResponse = _parse_puzzle_file(text)
+    fetchResponse = _get_puzzle_by_date(date)
     return fetchResponse
 
 
@@ -146,48 +167,155 @@ def _fetch_by_date(dateString):
 def _fetch_by_today():
     """
     Returns:
-        puzzle-data (dictionary)  : Compliant to schemas/puzzle-data-schema.json
+        puzzle (Puzzle)
     Raises:
         FetchNetworkError,
     """
-    text = _get_puzzle_by_date(datetime.date.today())
-    fetchResponse = _parse_puzzle_file(text)
+    fetchResponse = _get_puzzle_by_date(datetime.date.today())
     return fetchResponse
 
 
 def _get_puzzle_by_date(date):
     """
+    Streams the puzzle file for date and parses it as lines arrive, the
+    connection is closed as soon as the puzzle is parsed or rejected.
+
     Args:
-        text (string) : text from file retrieved from nytsyn.pzzl.com endpoint
+        date (datetime.date) : the target crossword release date
     Returns:
-        raw puzzle date
+        puzzle (Puzzle)
     Raises:
         FetchNetworkError:
+        FetchParsingError:
+        FetchUnsupportedError:
     """
+    baseUrl = 'https://nytsyn.pzzl.com/nytsyn-crossword-mh/nytsyncrossword?date='
+    url = baseUrl + date.strftime("%y%m%d")
+    UPSTREAM_REQUESTS.inc()
+    start = time.perf_counter()
     try:
-        baseUrl = 'https://nytsyn.pzzl.com/nytsyn-crossword-mh/nytsyncrossword?date='
-        url = baseUrl + date.strftime("%y%m%d")
-        response = requests.get(url)
+        response = requests.get(url, stream=True)
+        if not response.ok:
+            # the body is never read, release the connection
+            response.close()
         response.raise_for_status()
-    except requests.exceptions.Timeout as e:
-        logAndRaise(FetchNetworkError, f"Timeout trying to GET {url} : {str(e)} ")
     except requests.exceptions.RequestException as e:
+        UPSTREAM_ERRORS.inc(e.__class__.__name__)
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start)
+        if isinstance(e, requests.exceptions.Timeout):
+            logAndRaise(FetchNetworkError, f"Timeout trying to GET {url} : {str(e)} ")
         logAndRaise(FetchNetworkError, f"Failed to GET {url} : {str(e)}")
-    return response.content.decode('utf-8', errors='ignore')
-
 
+    # upstream latency is the wait for headers and body chunks, parse time
+    # is what remains of the parse once the body waits are taken out
+    transfer = {"seconds": time.perf_counter() - start}
+    lines = _iter_response_lines(response, url, transfer)
+    start = time.perf_counter()
+    headerSeconds = transfer["seconds"]
+    try:
+        with response:
+            return _parse_puzzle_lines(lines)
+    except FetchNetworkError:
+        raise
+    except Exception as e:
+        PARSE_ERRORS.inc(e.__class__.__name__)
+        raise
+    finally:
+        lines.close()
+        UPSTREAM_SECONDS.observe(transfer["seconds"])
+        bodySeconds = transfer["seconds"] - headerSeconds
+        PARSE_SECONDS.observe(time.perf_counter() - start - bodySeconds)
+
+
+def _iter_response_lines(response, url, transfer):
+    """
+    Args:
+        response (requests.Response) : a streamed response
+        url (string) : for error reporting
+        transfer (dict) : "seconds" is increased by the time spent waiting
+                          on body chunks
+    Yields:
+        line (string) : decoded body split on '\n', like str.split
+    Raises:
+        FetchNetworkError:
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    pending = ""
+    chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+    while True:
+        start = time.perf_counter()
+        try:
+            chunk = next(chunks, None)
+        except requests.exceptions.RequestException as e:
+            UPSTREAM_ERRORS.inc(e.__class__.__name__)
+            logAndRaise(FetchNetworkError, f"Failed reading {url} : {str(e)}")
+        finally:
+            transfer["seconds"] += time.perf_counter() - start
+        if chunk is None:
+            break
+        UPSTREAM_BYTES.inc(amount=len(chunk))
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split('\n')
+        yield from lines
+    yield pending + decoder.decode(b"", final=True)
+
+
+@timed(PARSE_SECONDS, PARSE_ERRORS)
 def _parse_puzzle_file(text):
     """
     Args:
         text (string) : text from file retrieved from nytsyn.pzzl.com endpoint
     Returns:
-        fetchResponse
+        puzzle (Puzzle)
     Raises:
         FetchParsingError:
         FetchUnsupportedError:
     """
+    return _parse_puzzle_lines(iter(text.split('\n')))
 
-    lines = text.split('\n')
+
+def _next_line(lines, expected):
+    """
+    Raises:
+        FetchParsingError: when lines is exhausted
+    """
+    line = next(lines, None)
+    if line is None:
+        logAndRaise(FetchParsingError,
+                    f"Unexpected end of puzzle file, expected {expected}")
+    return line
+
+
+def _int_line(lines, expected):
+    """
+    Raises:
+        FetchParsingError: when the line is not a positive integer
+    """
+    line = _next_line(lines, expected)
+    try:
+        value = int(line)
+    except ValueError:
+        logAndRaise(FetchParsingError, f"Unable to parse {expected} \"{line}\"")
+    if value <= 0:
+        logAndRaise(FetchParsingError, f"Invalid {expected} {value}")
+    return value
+
+
+def _parse_puzzle_lines(lines):
+    """
+    Consumes lines only as far as needed, so a streamed file is rejected
+    as soon as the offending line arrives. Geometry with more lines than
+    the header's rows is rejected, the original parser silently dropped
+    a single extra line.
+
+    Args:
+        lines (iterator[string]) : lines of a file from nytsyn.pzzl.com endpoint
+    Returns:
+        puzzle (Puzzle)
+    Raises:
+        FetchParsingError:
+        FetchUnsupportedError:
+    """
 
     # 0 is ARCHIVE
     # 2 is YYMMDD
@@ -198,11 +326,12 @@ def _parse_puzzle_file(text):
     # 16 is start of puzzle geometry : lineHeight = G
     # 16+G+1 is Across clues : acrossCluesCount = C
     # (16+G+1) + C + 1 is Down Clues : DownCluesCount = D
+    # odd lines in the header are blank
 
     ###################################
     # Integrity Check "ARCHIVE" Line
     ###################################
-    if lines[0] != "ARCHIVE":
+    if _next_line(lines, "ARCHIVE") != "ARCHIVE":
         logAndRaise(FetchParsingError,
                     "format appears off, expected ARCHIVE as first line")
 
@@ -210,25 +339,35 @@ def _parse_puzzle_file(text):
     # Puzzle Data
     ###################################
 
-    releaseDate = lines[2]  # yymmdd -> yyyymmdd
-    releaseDate = "20"+releaseDate
-    releaseDate = datetime.datetime.strptime(releaseDate, '%Y%m%d')
-
-    title = lines[4]
-    author = lines[6]
-    rows = int(lines[8])
-    columns = int(lines[10])
-    acrossClueCount = int(lines[12])
-    downClueCount = int(lines[14])
+    _next_line(lines, "header")
+    releaseDate = _next_line(lines, "release date")  # yymmdd -> yyyymmdd
+    try:
+        releaseDate = datetime.datetime.strptime("20"+releaseDate, '%Y%m%d')
+    except ValueError:
+        logAndRaise(FetchParsingError,
+                    f"Unable to parse release date \"{releaseDate}\"")
+    _next_line(lines, "header")
+    title = _next_line(lines, "title")
+    _next_line(lines, "header")
+    author = _next_line(lines, "author")
+    _next_line(lines, "header")
+    rows = _int_line(lines, "rows")
+    _next_line(lines, "header")
+    columns = _int_line(lines, "columns")
+    _next_line(lines, "header")
+    acrossClueCount = _int_line(lines, "across clue count")
+    _next_line(lines, "header")
+    downClueCount = _int_line(lines, "down clue count")
+    _next_line(lines, "header")
 
     ###################################
     # Extract Solution Geometry
     ###################################
 
-    solution = [['*'] * (columns+1) for i in range(0, rows+1)]
-    ln = 16
-    while (lines[ln] != ""):
-        line = lines[ln]
+    geometry = []
+    y = 0
+    line = _next_line(lines, "solution geometry")
+    while (line != ""):
         if "," in line:
             logAndRaise(FetchUnsupportedError,
                         "Solution geometry contains \",\" characters")
@@ -241,101 +380,91 @@ def _parse_puzzle_file(text):
         elif len(line) != columns:
             logAndRaise(FetchUnsupportedError,
                         f"Solution geometry contradicts row length : line length {len(line)} columns {columns}")
-
-        for i, c in enumerate(line):
-            solution[ln-16][i] = c
-        ln += 1
+        elif y >= rows:
+            logAndRaise(FetchParsingError,
+                        f"Solution geometry contradicts row count : rows {rows}")
+
+        geometry.append(line)
+        y += 1
+        line = _next_line(lines, "solution geometry")
+    # rows missing from a short geometry stay '*' as they always have
+    grid = "".join(geometry) + '*' * ((rows - y) * columns)
+
+    acrossStarts, downStarts = _word_starts(grid, rows, columns)
+    if len(acrossStarts) > acrossClueCount:
+        logAndRaise(FetchParsingError,
+                    f"Solution geometry has more across words than the {acrossClueCount} across clues")
+    if len(downStarts) > downClueCount:
+        logAndRaise(FetchParsingError,
+                    f"Solution geometry has more down words than the {downClueCount} down clues")
 
     ###################################
     # Extract Across Clues
     ###################################
-    acrossClues = []
-    ln += 1
-    acrossStop = ln + acrossClueCount
-    while (ln != acrossStop):
-        acrossClues.append(lines[ln])
-        ln += 1
-    # Integrity Check AC matches actual
-    if len(acrossClues) != acrossClueCount:
-        logAndRaise(FetchParsingError,
-                    f"Across Clues Count Integrity Check Failed : expected {acrossClueCount} got {len(acrossClues)}")
+    clues = _read_clues(lines, acrossStarts, acrossClueCount, ACROSS)
+    _next_line(lines, "down clues")
 
     ###################################
     # Extract Down Clues
     ###################################
-    downClues = []
-    ln += 1
-    downStop = ln + downClueCount
-    while (ln != downStop):
-        downClues.append(lines[ln])
-        ln += 1
-    # Integrity Check DC matches actual
-    if len(downClues) != downClueCount:
-        logAndRaise(FetchParsingError,
-                    f"Down Clues Count Integrity Check Failed : expected {downClueCount} got {len(downClues)}")
+    clues += _read_clues(lines, downStarts, downClueCount, DOWN)
 
-    ###################################
-    # Reconstitute into standard format
-    ###################################
+    # reading order, across before down on a shared start
+    clues.sort(key=lambda clue: (clue.y, clue.x, clue.d == DOWN))
+
+    return Puzzle(title, author, releaseDate.date(), rows, columns, grid, clues)
 
-    clues = []
+
+def _word_starts(grid, rows, columns):
+    """
+    Args:
+        grid (string) : rows * columns solution cells, row major
+        rows (int)
+        columns (int)
+    Returns:
+        (acrossStarts, downStarts) : lists of (x, y) in reading order
+    """
+    acrossStarts = []
+    downStarts = []
 
     for j in range(0, rows):
         for i in range(0, columns):
 
             # not a word start
-            if solution[j][i] == '#':
+            if grid[j * columns + i] == BLOCK:
                 continue
 
             # encountered start of across clue
-            if i != (columns-1) and (i == 0 or solution[j][i-1] == '#'):
-                # parse answer
-                answer = ""
-                x = i
-                while x != (columns) and solution[j][x] != '#':
-                    answer += solution[j][x]
-                    x += 1
-                # reconsitute
-                prompt = acrossClues.pop(0)
-                clues.append({
-                    "x": i,
-                    "y": j,
-                    "i": acrossClueCount - len(acrossClues),
-                    "d": "across",
-                    "prompt": prompt,
-                    "answer": answer
-                })
+            if i != (columns-1) and (i == 0 or grid[j * columns + i - 1] == BLOCK):
+                acrossStarts.append((i, j))
 
             # encountered start of down clue
-            if j != (rows-1) and (j == 0 or solution[j-1][i] == '#'):
-                # parse answer
-                answer = ""
-                y = j
-                while y != (rows) and solution[y][i] != '#':
-                    answer += solution[y][i]
-                    y += 1
-                prompt = downClues.pop(0)
-                clues.append({
-                    "x": i,
-                    "y": j,
-                    "i": downClueCount - len(downClues),
-                    "d": "down",
-                    "prompt": prompt,
-                    "answer": answer
-                })
-
-    fetchResponse = {
-        "meta": {
-            "plugin": PLUGIN_NAME,
-            "pluginVersion": VERSION,
-            "fetchDate": str(datetime.datetime.now())
-        },
-        "columns": columns,
-        "rows": rows,
-        "clues": clues,
-        "title": title,
-        "author": author,
-        "releaseDate": str(releaseDate.date())
-    }
+            if j != (rows-1) and (j == 0 or grid[(j - 1) * columns + i] == BLOCK):
+                downStarts.append((i, j))
 
-    return fetchResponse
+    return acrossStarts, downStarts
+
+
+def _read_clues(lines, starts, count, d):
+    """
+    Args:
+        lines (iterator[string])
+        starts (list) : (x, y) of each word start in reading order
+        count (int) : clue count from the header
+        d (string) : ACROSS or DOWN
+    Returns:
+        clues (list[Clue]) : prompts beyond the last word start are dropped
+    Raises:
+        FetchParsingError:
+    """
+    clues = []
+    for n in range(0, count):
+        prompt = next(lines, None)
+        # Integrity Check clue count matches actual
+        if prompt is None:
+            logAndRaise(FetchParsingError,
+                        f"{d.capitalize()} Clues Count Integrity Check Failed : expected {count} got {n}")
+        if n < len(starts):
+            x, y = starts[n]
+            clues.append(Clue(x, y, n + 1, d, prompt))
+    return clues
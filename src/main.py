@@ -1,3 +1,4 @@
+import os
 import json
 import fileinput
 import logging
@@ -17,7 +18,8 @@ from info import info
 from fetcher import fetch
 from methods import methods
 from schemas import REQUEST_SCHEMA,RESPONSE_SCHEMA
-from constants import API_VERSION
+from constants import API_VERSION, METRICS_TEXTFILE_ENV
+from metrics import write_textfile
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -107,5 +109,15 @@ if response == None:
     logging.critical(msg)
     response = generateErrorResponse("CriticalFailure", msg)
 
-print(json.dumps(response))
+print(json.dumps(response), flush=True)
+
+# metrics are optional, they are exported after the response is out and
+# a failure is only logged
+metricsTextfile = os.environ.get(METRICS_TEXTFILE_ENV)
+if metricsTextfile:
+    try:
+        write_textfile(metricsTextfile)
+    except Exception as e:
+        logging.error(f"Unable to write metrics to {metricsTextfile} : {e.__class__.__name__} {e}")
+
 exit(0)
@@ -0,0 +1,360 @@
+import fcntl
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+
+# Performance counters for the fetcher.
+#
+# Every invocation of the plugin is a short lived process, so counters only
+# cover a single request. write_textfile() merges them into a node-exporter
+# textfile (Prometheus text exposition format) : the existing file is read
+# under an exclusive lock, this process' samples are added on top and the
+# result replaces the file atomically. Only counters and histograms are
+# kept so every sample is additive across processes.
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+# give up on the textfile rather than wait on a stuck lock holder
+LOCK_TIMEOUT_SECONDS = 2.0
+LOCK_POLL_SECONDS = 0.05
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _sample_key(name, labelNames, labelValues):
+    if not labelNames:
+        return name
+    labels = ",".join(f"{n}=\"{_escape(v)}\"" for n, v in zip(labelNames, labelValues))
+    return f"{name}{{{labels}}}"
+
+
+def _format_le(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+_ESCAPED = re.compile(r'\\(.)')
+
+
+def _parse_key(key):
+    """
+    Args:
+        key (string) : sample name and labels, as written by _sample_key
+    Returns:
+        (name, labels) : labels is a dict of label name -> unescaped value
+    """
+    name, _, labels = key.partition("{")
+    return name, {
+        n: _ESCAPED.sub(lambda m: "\n" if m.group(1) == "n" else m.group(1), v)
+        for n, v in _LABEL.findall(labels)
+    }
+
+
+class Counter:
+    TYPE = "counter"
+
+    def __init__(self, name, description, labelNames=()):
+        self.name = name
+        self.description = description
+        self.labelNames = tuple(labelNames)
+        self._values = {}
+
+    def inc(self, *labelValues, amount=1):
+        self._values[labelValues] = self._values.get(labelValues, 0) + amount
+
+    def empty(self):
+        return Counter(self.name, self.description, self.labelNames)
+
+    def add(self, other):
+        for labelValues, value in other._values.items():
+            self.inc(*labelValues, amount=value)
+
+    def load(self, name, labels, value):
+        """
+        Add a sample read back from a textfile.
+
+        Returns:
+            accepted (bool) : False if this family can not produce the sample
+        """
+        if name != self.name or set(labels) != set(self.labelNames):
+            return False
+        self.inc(*(labels[n] for n in self.labelNames), amount=value)
+        return True
+
+    def sampleNames(self):
+        return (self.name,)
+
+    def samples(self):
+        for labelValues, value in self._values.items():
+            yield _sample_key(self.name, self.labelNames, labelValues), value
+
+
+class Histogram:
+    TYPE = "histogram"
+
+    def __init__(self, name, description, labelNames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelNames = tuple(labelNames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labelValues -> [ bucket counts..., sum, count ]
+        self._values = {}
+
+    def observe(self, value, *labelValues):
+        state = self._state(labelValues)
+        for n, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[n] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def empty(self):
+        return Histogram(self.name, self.description, self.labelNames, self.buckets[:-1])
+
+    def _state(self, labelValues):
+        state = self._values.get(labelValues)
+        if state is None:
+            state = [0] * (len(self.buckets) + 2)
+            self._values[labelValues] = state
+        return state
+
+    def add(self, other):
+        for labelValues, otherState in other._values.items():
+            state = self._state(labelValues)
+            for n, value in enumerate(otherState):
+                state[n] += value
+
+    def load(self, name, labels, value):
+        """
+        Add a sample read back from a textfile.
+
+        Returns:
+            accepted (bool) : False if this family can not produce the sample,
+                              including buckets outside the current layout
+        """
+        if name == self.name + "_bucket":
+            les = [_format_le(bound) for bound in self.buckets]
+            if set(labels) != set(self.labelNames + ("le",)) or labels["le"] not in les:
+                return False
+            index = les.index(labels["le"])
+        elif name in (self.name + "_sum", self.name + "_count"):
+            if set(labels) != set(self.labelNames):
+                return False
+            index = -2 if name.endswith("_sum") else -1
+        else:
+            return False
+        self._state(tuple(labels[n] for n in self.labelNames))[index] += value
+        return True
+
+    def sampleNames(self):
+        return (self.name + "_bucket", self.name + "_sum", self.name + "_count")
+
+    def samples(self):
+        bucketLabels = self.labelNames + ("le",)
+        for labelValues, state in self._values.items():
+            for n, bound in enumerate(self.buckets):
+                yield _sample_key(self.name + "_bucket", bucketLabels,
+                                  labelValues + (_format_le(bound),)), state[n]
+            yield _sample_key(self.name + "_sum", self.labelNames, labelValues), state[-2]
+            yield _sample_key(self.name + "_count", self.labelNames, labelValues), state[-1]
+
+
+class Registry:
+
+    def __init__(self):
+        self._families = []
+
+    def counter(self, name, description, labelNames=()):
+        return self._register(Counter(name, description, labelNames))
+
+    def histogram(self, name, description, labelNames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, description, labelNames, buckets))
+
+    def _register(self, family):
+        self._families.append(family)
+        return family
+
+    def samples(self):
+        """
+        Returns:
+            samples (dict) : sample key (name and labels) -> value
+        """
+        samples = {}
+        for family in self._families:
+            samples.update(family.samples())
+        return samples
+
+    def merged(self, samples):
+        """
+        Args:
+            samples (dict) : sample key -> value, as read back by _parse_textfile
+        Returns:
+            registry (Registry) : a new registry holding samples plus this
+                                  registry's values. A family with any sample
+                                  it can not produce (an older bucket layout
+                                  or label set) starts over from this
+                                  registry's values instead of mixing layouts.
+        """
+        parsed = [(_parse_key(key), value) for key, value in samples.items()]
+        merged = Registry()
+        for family in self._families:
+            names = family.sampleNames()
+            owned = [(name, labels, value) for (name, labels), value in parsed
+                     if name in names]
+            loaded = family.empty()
+            if not all(loaded.load(*sample) for sample in owned):
+                logging.warning(f"resetting metric {family.name}, stored samples do not match its layout")
+                loaded = family.empty()
+            loaded.add(family)
+            merged._register(loaded)
+        return merged
+
+    def render(self):
+        """
+        Returns:
+            exposition (string) : Prometheus text format
+        """
+        lines = []
+        for family in self._families:
+            samples = list(family.samples())
+            if not samples:
+                continue
+            lines.append(f"# HELP {family.name} {_escape(family.description)}")
+            lines.append(f"# TYPE {family.name} {family.TYPE}")
+            for key, value in samples:
+                lines.append(f"{key} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value):
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _parse_textfile(text):
+    """
+    Args:
+        text (string) : a textfile previously written by write_textfile
+    Returns:
+        samples (dict) : sample key -> value
+    """
+    samples = {}
+    for line in text.split("\n"):
+        if line == "" or line.startswith("#"):
+            continue
+        key, _, value = line.rpartition(" ")
+        try:
+            samples[key] = float(value)
+        except ValueError:
+            logging.warning(f"skipping malformed metrics line : {line}")
+    return samples
+
+
+REGISTRY = Registry()
+
+FETCH_REQUESTS = REGISTRY.counter(
+    "nytsyn_fetch_requests_total",
+    "Fetch requests handled, by fetch method",
+    ["method"])
+FETCH_ERRORS = REGISTRY.counter(
+    "nytsyn_fetch_errors_total",
+    "Failed fetch requests, by fetch method and exception class",
+    ["method", "error"])
+FETCH_SECONDS = REGISTRY.histogram(
+    "nytsyn_fetch_duration_seconds",
+    "Time to serve a fetch request, by fetch method",
+    ["method"])
+
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "nytsyn_upstream_requests_total",
+    "GET requests made to nytsyn.pzzl.com")
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "nytsyn_upstream_errors_total",
+    "Failed GET requests to nytsyn.pzzl.com, by exception class",
+    ["error"])
+UPSTREAM_BYTES = REGISTRY.counter(
+    "nytsyn_upstream_bytes_total",
+    "Decoded (decompressed) body bytes received from nytsyn.pzzl.com")
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "nytsyn_upstream_duration_seconds",
+    "Latency of GET requests to nytsyn.pzzl.com, waiting on headers and body")
+
+PARSE_ERRORS = REGISTRY.counter(
+    "nytsyn_parse_errors_total",
+    "Failed puzzle file parses, by exception class",
+    ["error"])
+PARSE_SECONDS = REGISTRY.histogram(
+    "nytsyn_parse_duration_seconds",
+    "Time to parse a puzzle file, excluding waits on the network",
+    buckets=PARSE_BUCKETS)
+
+
+@contextmanager
+def timed(histogram, errors, *labelValues):
+    """
+    Observe the duration of the block in histogram and count any exception
+    escaping it in errors, labelled by exception class, then reraise.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        errors.inc(*labelValues, e.__class__.__name__)
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, *labelValues)
+
+
+def _lock(lock):
+    """
+    Raises:
+        TimeoutError: when the lock is not acquired within LOCK_TIMEOUT_SECONDS
+    """
+    deadline = time.monotonic() + LOCK_TIMEOUT_SECONDS
+    while True:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"metrics textfile lock {lock.name} is held")
+            time.sleep(LOCK_POLL_SECONDS)
+
+
+def write_textfile(path, registry=REGISTRY):
+    """
+    Merge the registry's samples into the textfile at path, samples in
+    the file that the registry's families can not produce are dropped.
+
+    Args:
+        path (string) : target file, should end in .prom for node-exporter
+    Raises:
+        OSError: including TimeoutError when the lock is held for longer
+                 than LOCK_TIMEOUT_SECONDS
+    """
+    with open(path + ".lock", "a") as lock:
+        _lock(lock)
+        try:
+            # undecodable bytes become malformed lines that are skipped
+            with open(path, encoding="utf-8", errors="replace") as f:
+                samples = _parse_textfile(f.read())
+        except FileNotFoundError:
+            samples = {}
+
+        merged = registry.merged(samples)
+
+        tmpPath = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmpPath, "w", encoding="utf-8") as f:
+                f.write(merged.render())
+            os.replace(tmpPath, path)
+        except BaseException:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
@@ -0,0 +1,105 @@
+import datetime
+from constants import PLUGIN_NAME, VERSION
+
+# Compact in memory representation of a parsed puzzle.
+#
+# The solution geometry is held as a single string of rows * columns
+# cells (row major, 1 byte per cell for ascii grids) and clues are
+# __slots__ records that only carry their position, index, direction and
+# prompt. Answers are not stored, they are read back out of the grid when
+# needed. The JSON dict shape expected by
+# the puzzle-data schema is only built by Puzzle.to_dict() at the
+# serialization boundary.
+
+BLOCK = '#'
+
+ACROSS = "across"
+DOWN = "down"
+
+
+class Clue:
+    __slots__ = ("x", "y", "i", "d", "prompt")
+
+    def __init__(self, x, y, i, d, prompt):
+        self.x = x
+        self.y = y
+        self.i = i
+        self.d = d
+        self.prompt = prompt
+
+
+class Puzzle:
+    __slots__ = ("title", "author", "releaseDate", "fetchDate",
+                 "rows", "columns", "grid", "clues")
+
+    def __init__(self, title, author, releaseDate, rows, columns, grid, clues,
+                 fetchDate=None):
+        """
+        Args:
+            title (string)
+            author (string)
+            releaseDate (datetime.date)
+            rows (int)
+            columns (int)
+            grid (string) : rows * columns solution cells, row major
+            clues (list[Clue]) : in reading order
+            fetchDate (datetime.datetime) : defaults to now
+        """
+        self.title = title
+        self.author = author
+        self.releaseDate = releaseDate
+        self.fetchDate = fetchDate if fetchDate is not None else datetime.datetime.now()
+        self.rows = rows
+        self.columns = columns
+        self.grid = grid
+        self.clues = clues
+
+    def answer(self, clue):
+        """
+        Args:
+            clue (Clue)
+        Returns:
+            answer (string) : solution cells from the clue start up to the
+                              next block or the edge of the grid
+        """
+        if clue.d == ACROSS:
+            start = clue.y * self.columns + clue.x
+            stop = (clue.y + 1) * self.columns
+            step = 1
+        else:
+            start = clue.y * self.columns + clue.x
+            stop = self.rows * self.columns
+            step = self.columns
+        end = start
+        while end < stop and self.grid[end] != BLOCK:
+            end += step
+        return self.grid[start:end:step]
+
+    def to_dict(self):
+        """
+        Returns:
+            fetchResponse (dictionary) : Compliant to schemas/puzzle-data-schema.json
+        """
+        return {
+            "meta": {
+                "plugin": PLUGIN_NAME,
+                "pluginVersion": VERSION,
+                "fetchDate": str(self.fetchDate)
+            },
+            "columns": self.columns,
+            "rows": self.rows,
+            "clues": [
+                {
+                    "x": clue.x,
+                    "y": clue.y,
+                    "i": clue.i,
+                    "d": clue.d,
+                    "prompt": clue.prompt,
+                    "answer": self.answer(clue)
+                }
+                for clue in self.clues
+            ],
+            "title": self.title,
+            "author": self.author,
+            "releaseDate": str(self.releaseDate)
+        }
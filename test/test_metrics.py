@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import fcntl
+import subprocess
+import pytest
+import requests
+import metrics
+from metrics import Registry, write_textfile, _parse_textfile
+
+
+def _registry(buckets=(0.1, 1.0)):
+    registry = Registry()
+    requests = registry.counter("t_requests_total", "requests", ["method"])
+    seconds = registry.histogram("t_seconds", "seconds", ["method"], buckets)
+    return registry, requests, seconds
+
+################################################################################
+# render / parse
+################################################################################
+
+
+def test_render_counter_and_histogram():
+    registry, requests, seconds = _registry()
+    requests.inc("date")
+    requests.inc("date", amount=2)
+    seconds.observe(0.5, "date")
+    assert registry.render() == "\n".join([
+        "# HELP t_requests_total requests",
+        "# TYPE t_requests_total counter",
+        't_requests_total{method="date"} 3',
+        "# HELP t_seconds seconds",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{method="date",le="0.1"} 0',
+        't_seconds_bucket{method="date",le="1.0"} 1',
+        't_seconds_bucket{method="date",le="+Inf"} 1',
+        't_seconds_sum{method="date"} 0.5',
+        't_seconds_count{method="date"} 1',
+    ]) + "\n"
+
+
+def test_render_skips_empty_families():
+    registry, requests, seconds = _registry()
+    assert registry.render() == "\n"
+
+
+def test_parse_textfile_reads_rendered_samples():
+    registry, requests, seconds = _registry()
+    requests.inc("date")
+    seconds.observe(0.05, "date")
+    samples = _parse_textfile(registry.render())
+    assert samples == {key: float(value) for key, value in registry.samples().items()}
+
+
+def test_parse_textfile_skips_comments_and_malformed_lines():
+    samples = _parse_textfile("# HELP x y\nx 1\nnot a number\n\n")
+    assert samples == {"x": 1.0}
+
+
+def test_label_values_round_trip_escaping():
+    registry, requests, seconds = _registry()
+    requests.inc('we"ird\\lab\nel')
+    merged = registry.merged(_parse_textfile(registry.render()))
+    assert merged.samples() == {'t_requests_total{method="we\\"ird\\\\lab\\nel"}': 2}
+
+################################################################################
+# merging into the textfile
+################################################################################
+
+
+def test_write_textfile_accumulates_across_processes(tmp_path):
+    path = str(tmp_path / "nytsyn.prom")
+    for _ in range(3):
+        # a fresh registry per simulated process
+        registry, requests, seconds = _registry()
+        requests.inc("date")
+        seconds.observe(0.5, "date")
+        write_textfile(path, registry)
+
+    with open(path) as f:
+        samples = _parse_textfile(f.read())
+    assert samples['t_requests_total{method="date"}'] == 3
+    assert samples['t_seconds_bucket{method="date",le="0.1"}'] == 0
+    assert samples['t_seconds_bucket{method="date",le="1.0"}'] == 3
+    assert samples['t_seconds_count{method="date"}'] == 3
+    assert sorted(os.listdir(tmp_path)) == ["nytsyn.prom", "nytsyn.prom.lock"]
+
+
+def test_write_textfile_keeps_new_label_sets_grouped(tmp_path):
+    path = str(tmp_path / "nytsyn.prom")
+    for method in ("date", "today"):
+        registry, requests, seconds = _registry()
+        seconds.observe(0.5, method)
+        write_textfile(path, registry)
+
+    with open(path) as f:
+        names = [line.split("{")[0] for line in f.read().split("\n")
+                 if line.startswith("t_seconds")]
+    assert names == (["t_seconds_bucket"] * 3 + ["t_seconds_sum", "t_seconds_count"]) * 2
+
+
+def test_write_textfile_resets_histogram_with_changed_buckets(tmp_path):
+    path = str(tmp_path / "nytsyn.prom")
+    registry, requests, seconds = _registry(buckets=(0.005, 0.5))
+    requests.inc("date")
+    seconds.observe(0.001, "date")
+    write_textfile(path, registry)
+
+    registry, requests, seconds = _registry(buckets=(0.1, 1.0))
+    requests.inc("date")
+    seconds.observe(0.5, "date")
+    write_textfile(path, registry)
+
+    with open(path) as f:
+        samples = _parse_textfile(f.read())
+    # the counter still merges, the histogram only holds the new layout
+    assert samples['t_requests_total{method="date"}'] == 2
+    assert not any('le="0.005"' in key or 'le="0.5"' in key for key in samples)
+    assert samples['t_seconds_bucket{method="date",le="1.0"}'] == 1
+    assert samples['t_seconds_count{method="date"}'] == 1
+
+
+def test_write_textfile_drops_unknown_samples(tmp_path):
+    path = str(tmp_path / "nytsyn.prom")
+    with open(path, "w") as f:
+        f.write('t_gone_total 4\nt_requests_total{method="date"} 2\n')
+    registry, requests, seconds = _registry()
+    requests.inc("date")
+    write_textfile(path, registry)
+
+    with open(path) as f:
+        assert _parse_textfile(f.read()) == {'t_requests_total{method="date"}': 3.0}
+
+
+def test_write_textfile_removes_tmp_file_on_failure(tmp_path, monkeypatch):
+    path = str(tmp_path / "nytsyn.prom")
+    registry, requests, seconds = _registry()
+    requests.inc("date")
+
+    def failingReplace(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(metrics.os, "replace", failingReplace)
+
+    with pytest.raises(OSError):
+        write_textfile(path, registry)
+    assert sorted(os.listdir(tmp_path)) == ["nytsyn.prom.lock"]
+
+
+def test_write_textfile_replaces_corrupt_file(tmp_path):
+    path = str(tmp_path / "nytsyn.prom")
+    with open(path, "wb") as f:
+        f.write(b"\xff\xfe bad\nt_requests_total{method=\"date\"} \xff\n")
+    registry, requests, seconds = _registry()
+    requests.inc("date")
+    write_textfile(path, registry)
+
+    with open(path) as f:
+        assert _parse_textfile(f.read()) == {'t_requests_total{method="date"}': 1.0}
+
+
+def test_write_textfile_gives_up_on_held_lock(tmp_path, monkeypatch):
+    path = str(tmp_path / "nytsyn.prom")
+    monkeypatch.setattr(metrics, "LOCK_TIMEOUT_SECONDS", 0.1)
+    registry, requests, seconds = _registry()
+    requests.inc("date")
+    with open(path + ".lock", "a") as holder:
+        fcntl.flock(holder, fcntl.LOCK_EX)
+        with pytest.raises(TimeoutError):
+            write_textfile(path, registry)
+    assert not os.path.exists(path)
+
+################################################################################
+# main.py export
+################################################################################
+
+
+def test_main_responds_with_corrupt_textfile(tmp_path):
+    try:
+        import schemas  # noqa: F401
+    except requests.exceptions.RequestException:
+        pytest.skip("request and response schemas are not reachable")
+    path = str(tmp_path / "nytsyn.prom")
+    with open(path, "wb") as f:
+        f.write(b"\xff\xfe bad")
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+    result = subprocess.run(
+        [sys.executable, "main.py"],
+        input=json.dumps({"apiVersion": "v1", "type": "info"}),
+        capture_output=True,
+        text=True,
+        cwd=src,
+        env={**os.environ, "NYTSYN_METRICS_TEXTFILE": path},
+    )
+    assert result.returncode == 0
+    assert json.loads(result.stdout)["type"] == "info"
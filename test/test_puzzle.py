@@ -0,0 +1,98 @@
+import os
+import json
+import datetime
+import pytest
+import requests
+from jsonschema import Draft7Validator
+from constants import API_VERSION
+from puzzle import Puzzle, Clue, ACROSS, DOWN
+from fetcher import _parse_puzzle_file
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def _to_dict_without_fetch_date(puzzle):
+    data = puzzle.to_dict()
+    data["meta"].pop("fetchDate")
+    return data
+
+################################################################################
+# to_dict matches the puzzle-data produced by the original dict based parser
+################################################################################
+
+
+@pytest.mark.parametrize("name", ["nytsyn-15x15", "nytsyn-5x5-short"])
+def test_to_dict_matches_fixture(name):
+    puzzle = _parse_puzzle_file(_fixture(name + ".txt"))
+    assert _to_dict_without_fetch_date(puzzle) == json.loads(_fixture(name + ".json"))
+
+
+def test_to_dict_meta_and_dates():
+    fetchDate = datetime.datetime(2025, 4, 4, 12, 30)
+    puzzle = Puzzle("t", "a", datetime.date(2025, 4, 4), 1, 2, "AB", [], fetchDate)
+    data = puzzle.to_dict()
+    assert data["meta"]["fetchDate"] == str(fetchDate)
+    assert data["releaseDate"] == "2025-04-04"
+    assert data["clues"] == []
+
+
+def test_to_dict_conforms_to_response_schema():
+    try:
+        from schemas import RESPONSE_SCHEMA
+    except requests.exceptions.RequestException:
+        pytest.skip("response schema is not reachable")
+    response = {
+        "type": "fetch",
+        "apiVersion": API_VERSION,
+        "fetch": _parse_puzzle_file(_fixture("nytsyn-15x15.txt")).to_dict()
+    }
+    Draft7Validator(schema=RESPONSE_SCHEMA).validate(response)
+
+################################################################################
+# answers are read back out of the grid
+################################################################################
+
+# AB#
+# CDE
+# #FG
+GRID = "AB#CDE#FG"
+
+
+def _answer(x, y, d):
+    puzzle = Puzzle("t", "a", datetime.date(2025, 4, 4), 3, 3, GRID, [])
+    return puzzle.answer(Clue(x, y, 1, d, "prompt"))
+
+
+def test_answer_across_stops_at_block():
+    assert _answer(0, 0, ACROSS) == "AB"
+
+
+def test_answer_across_runs_to_right_edge():
+    assert _answer(0, 1, ACROSS) == "CDE"
+    assert _answer(1, 2, ACROSS) == "FG"
+
+
+def test_answer_down_stops_at_block():
+    assert _answer(0, 0, DOWN) == "AC"
+
+
+def test_answer_down_runs_to_bottom_edge():
+    assert _answer(1, 0, DOWN) == "BDF"
+    assert _answer(2, 1, DOWN) == "EG"
+
+
+def test_answer_keeps_star_padding_of_short_geometry():
+    puzzle = _parse_puzzle_file(_fixture("nytsyn-5x5-short.txt"))
+    answers = {(c.x, c.y, c.d): puzzle.answer(c) for c in puzzle.clues}
+    assert answers[(1, 0, DOWN)] == "BÉJN*"
+    assert answers[(0, 3, ACROSS)] == "MNOPQ"
+
+
+def test_non_ascii_geometry_is_accepted():
+    puzzle = _parse_puzzle_file(_fixture("nytsyn-5x5-short.txt"))
+    assert puzzle.grid[5:10] == "EÉGHI"
@@ -0,0 +1,202 @@
+import os
+import json
+import datetime
+import pytest
+import requests
+import fetcher
+from exceptions import FetchNetworkError, FetchParsingError, FetchUnsupportedError
+from metrics import UPSTREAM_ERRORS, PARSE_ERRORS
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DATE = datetime.date(2025, 4, 4)
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class FakeResponse:
+    """Streamed response serving body in chunks of chunkSize bytes"""
+
+    def __init__(self, body, chunkSize=7, status=200, failAfter=None):
+        self.body = body
+        self.chunkSize = chunkSize
+        self.status_code = status
+        self.ok = status < 400
+        self.failAfter = failAfter
+        self.served = 0
+        self.closed = False
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error")
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), self.chunkSize):
+            if self.failAfter is not None and start >= self.failAfter:
+                raise requests.exceptions.ChunkedEncodingError("connection broken")
+            self.served = start + self.chunkSize
+            yield self.body[start:start + self.chunkSize]
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Serve the next GET with a FakeResponse built from the given args"""
+    def serve(body, **kwargs):
+        response = FakeResponse(body, **kwargs)
+        monkeypatch.setattr(fetcher.requests, "get", lambda url, stream: response)
+        return response
+    return serve
+
+
+def _expected(name):
+    return json.loads(_fixture(name + ".json"))
+
+
+def _to_dict_without_fetch_date(puzzle):
+    data = puzzle.to_dict()
+    data["meta"].pop("fetchDate")
+    return data
+
+
+def _count(counter, *labelValues):
+    return counter._values.get(labelValues, 0)
+
+
+def _header(rows="5", columns="5", across="1", down="1", date="250404"):
+    return "\n".join(["ARCHIVE", "", date, "", "title", "", "author", "",
+                      rows, "", columns, "", across, "", down, ""]) + "\n"
+
+################################################################################
+# well formed files
+################################################################################
+
+
+@pytest.mark.parametrize("chunkSize", [1, 2, 7, 1024, 1 << 20])
+@pytest.mark.parametrize("name", ["nytsyn-15x15", "nytsyn-5x5-short"])
+def test_streamed_parse_matches_fixture(serve, name, chunkSize):
+    # chunk sizes of 1 and 2 split lines and multibyte characters
+    response = serve(_fixture(name + ".txt").encode("utf-8"), chunkSize=chunkSize)
+    puzzle = fetcher._get_puzzle_by_date(DATE)
+    assert _to_dict_without_fetch_date(puzzle) == _expected(name)
+    assert response.closed
+
+
+def test_iter_response_lines_splits_like_str_split():
+    text = "a\nbé\n\nc“d”\n"
+    transfer = {"seconds": 0.0}
+    lines = fetcher._iter_response_lines(FakeResponse(text.encode("utf-8"), chunkSize=1), "u", transfer)
+    assert list(lines) == text.split("\n")
+    assert transfer["seconds"] > 0
+
+
+def test_iter_response_lines_drops_invalid_utf8():
+    lines = fetcher._iter_response_lines(FakeResponse(b"a\xff\nb", chunkSize=1), "u", {"seconds": 0.0})
+    assert list(lines) == ["a", "b"]
+
+################################################################################
+# rejected files
+################################################################################
+
+
+@pytest.mark.parametrize("cut", [0, 3, 40, 110, 200, -40, -8])
+def test_truncated_file_is_a_parsing_error(serve, cut):
+    # -8 drops the whole last down prompt "\nDown 7\n"
+    body = _fixture("nytsyn-5x5-short.txt").encode("utf-8")
+    response = serve(body[:cut] if cut else b"")
+    with pytest.raises(FetchParsingError):
+        fetcher._get_puzzle_by_date(DATE)
+    assert response.closed
+
+
+@pytest.mark.parametrize("header, message", [
+    (_header(rows="x"), "Unable to parse rows \"x\""),
+    (_header(columns="0"), "Invalid columns 0"),
+    (_header(across="-1"), "Invalid across clue count -1"),
+    (_header(date="25x404"), "Unable to parse release date \"25x404\""),
+])
+def test_bad_header_is_a_parsing_error(serve, header, message):
+    serve(header.encode("utf-8"))
+    with pytest.raises(FetchParsingError) as e:
+        fetcher._get_puzzle_by_date(DATE)
+    assert e.value.message == message
+
+
+def test_geometry_longer_than_rows_is_rejected(serve):
+    # the original parser silently ignored exactly one extra geometry row
+    lines = _fixture("nytsyn-5x5-short.txt").split("\n")
+    lines[8] = "3"  # rows, the fixture has 4 geometry lines
+    serve("\n".join(lines).encode("utf-8"))
+    with pytest.raises(FetchParsingError) as e:
+        fetcher._get_puzzle_by_date(DATE)
+    assert e.value.message == "Solution geometry contradicts row count : rows 3"
+
+
+def test_not_archive_is_rejected_at_first_line(serve):
+    response = serve(b"<html>\n" + b"x" * 10000, chunkSize=16)
+    with pytest.raises(FetchParsingError):
+        fetcher._get_puzzle_by_date(DATE)
+    assert response.served == 16
+    assert response.closed
+
+
+def test_unsupported_geometry_aborts_download(serve):
+    text = _fixture("nytsyn-15x15.txt")
+    lines = text.split("\n")
+    lines[17] = lines[17][:3] + "." + lines[17][4:]
+    body = "\n".join(lines).encode("utf-8")
+    before = _count(PARSE_ERRORS, "FetchUnsupportedError")
+    response = serve(body, chunkSize=64)
+    with pytest.raises(FetchUnsupportedError):
+        fetcher._get_puzzle_by_date(DATE)
+    assert response.served < len(body) / 4
+    assert response.closed
+    assert _count(PARSE_ERRORS, "FetchUnsupportedError") == before + 1
+
+
+def test_more_word_starts_than_clues_is_rejected_before_prompts(serve):
+    text = _fixture("nytsyn-5x5-short.txt")
+    lines = text.split("\n")
+    lines[12] = "1"  # across clue count
+    body = "\n".join(lines).encode("utf-8")
+    geometryEnd = len("\n".join(lines[:21]).encode("utf-8"))
+    response = serve(body, chunkSize=8)
+    with pytest.raises(FetchParsingError) as e:
+        fetcher._get_puzzle_by_date(DATE)
+    assert "more across words" in e.value.message
+    assert response.served < geometryEnd + 16
+    assert response.closed
+
+################################################################################
+# network failures
+################################################################################
+
+
+def test_failure_mid_stream_is_a_network_error_counted_once(serve):
+    upstreamBefore = _count(UPSTREAM_ERRORS, "ChunkedEncodingError")
+    parseBefore = _count(PARSE_ERRORS, "FetchNetworkError")
+    response = serve(_fixture("nytsyn-15x15.txt").encode("utf-8"), chunkSize=256, failAfter=2048)
+    with pytest.raises(FetchNetworkError):
+        fetcher._get_puzzle_by_date(DATE)
+    assert response.closed
+    assert _count(UPSTREAM_ERRORS, "ChunkedEncodingError") == upstreamBefore + 1
+    assert _count(PARSE_ERRORS, "FetchNetworkError") == parseBefore
+
+
+def test_http_error_closes_response(serve):
+    before = _count(UPSTREAM_ERRORS, "HTTPError")
+    response = serve(b"", status=404)
+    with pytest.raises(FetchNetworkError):
+        fetcher._get_puzzle_by_date(DATE)
+    assert response.closed
+    assert _count(UPSTREAM_ERRORS, "HTTPError") == before + 1